@@ -9,6 +9,8 @@ from pathlib import Path
 from google import genai
 from google.genai import types, errors as genai_errors
 
+import minutes_store
+
 # ---------------------------------------------------------
 # 設定
 # ---------------------------------------------------------
@@ -35,12 +37,12 @@ def load_credentials():
 # ログファイルのパス
 LOG_DIR = Path("logs")
 LOG_FILE = LOG_DIR / "usage_log.csv"
-MINUTES_DIR = LOG_DIR / "minutes"
+MINUTES_DIR = minutes_store.MINUTES_DIR
 
 def init_log_file():
     """ログファイルを初期化（存在しない場合はヘッダーを作成、既存の場合はヘッダーを更新）"""
     LOG_DIR.mkdir(exist_ok=True)
-    MINUTES_DIR.mkdir(exist_ok=True)
+    minutes_store.init_store()
     
     expected_headers = [
         "実行日時", "ファイル名", "ファイルサイズ(MB)", 
@@ -82,24 +84,47 @@ def init_log_file():
             pass
 
 def save_minutes(minutes_text, original_filename):
-    """議事録をファイルに保存し、ファイルパスを返す"""
+    """議事録を圧縮保存し（同一内容は重複保存しない）、使用ログに記録するパスを返す"""
     try:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        # ファイル名から拡張子を除いた部分を取得
-        base_name = Path(original_filename).stem
-        # ファイル名に使用できない文字を置換
-        safe_name = "".join(c if c.isalnum() or c in (' ', '-', '_') else '_' for c in base_name)
-        minutes_filename = f"{timestamp}_{safe_name}.md"
-        minutes_path = MINUTES_DIR / minutes_filename
-        
-        with open(minutes_path, "w", encoding="utf-8") as f:
-            f.write(minutes_text)
-        
-        return str(minutes_path)
+        minutes_path = minutes_store.store_minutes(minutes_text, original_filename)
     except Exception as e:
         st.warning(f"議事録の保存に失敗しました: {e}")
         return ""
 
+    # 保持期間・容量上限を超えた古い議事録を削除（今回保存した議事録は対象外）
+    try:
+        minutes_store.enforce_retention(protect=minutes_path)
+    except Exception as e:
+        st.warning(f"古い議事録の削除に失敗しました: {e}")
+
+    # 存在しないパスを使用ログに残さない
+    if not Path(minutes_path).exists():
+        st.warning("議事録の保存に失敗しました: 保存したファイルが見つかりません")
+        return ""
+    return minutes_path
+
+@st.cache_resource
+def migrate_legacy_minutes():
+    """従来形式の議事録を圧縮保存に移行し、移行できなかったファイルを返す（起動後1回のみ実行）"""
+    try:
+        return minutes_store.migrate_legacy_minutes()
+    except Exception as e:
+        return [(str(MINUTES_DIR), str(e))]
+
+def load_minutes_history(limit=50):
+    """使用ログから議事録が保存された実行を新しい順に返す"""
+    if not LOG_FILE.exists():
+        return []
+    try:
+        with open(LOG_FILE, "r", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            rows = [row for row in reader if len(row) >= 7 and row[6]]
+    except Exception as e:
+        st.warning(f"ログの読み込みに失敗しました: {e}")
+        return []
+    return rows[::-1][:limit]
+
 def log_usage(filename, filesize_mb, processing_time, status, error_msg="", minutes_file=""):
     """使用ログをCSVに記録"""
     try:
@@ -122,6 +147,10 @@ init_log_file()
 
 st.set_page_config(page_title="議事録メーカー（Vertex AI版）", layout="wide")
 
+# 従来形式の議事録の移行（失敗しても他の機能は使えるよう警告のみ表示）
+for legacy_path, error in migrate_legacy_minutes():
+    st.sidebar.warning(f"議事録 {legacy_path} の移行に失敗しました: {error}")
+
 st.title("🎙️ 議事録メーカー（Vertex AI / Gemini 2.5 Pro）")
 st.markdown("音声ファイルをアップロードすると、Vertex AI 上の Gemini が内容を聴き取り、議事録を作成します。")
 
@@ -348,3 +377,37 @@ if uploaded_file is not None and st.button("議事録を作成する"):
             # デバッグ用（開発時のみ表示）
             if st.sidebar.checkbox("詳細なエラー情報を表示"):
                 st.exception(e)
+
+# ---------------------------------------------------------
+# 過去の議事録
+# ---------------------------------------------------------
+with st.expander("📂 過去の議事録"):
+    history = load_minutes_history()
+    if not history:
+        st.info("保存された議事録はまだありません。")
+    else:
+        selected = st.selectbox(
+            "表示する議事録",
+            history,
+            format_func=lambda row: f"{row[0]}  {row[1]}"
+        )
+        try:
+            past_minutes = minutes_store.load_minutes(selected[6])
+        except Exception as e:
+            past_minutes = None
+            st.warning(f"議事録の読み込みに失敗しました: {e}")
+        if past_minutes is not None:
+            st.markdown(past_minutes)
+            st.download_button(
+                label="テキストファイルとしてダウンロード",
+                data=past_minutes,
+                file_name=f"{Path(selected[1]).stem}_minutes.md",
+                mime="text/markdown",
+                key="past_minutes_download"
+            )
+        else:
+            deletion = minutes_store.find_deletion(selected[6])
+            if deletion:
+                st.info(f"この議事録は{deletion[1]}のため {deletion[0]} に削除されました。")
+            else:
+                st.warning("議事録ファイルが見つかりません。")
@@ -0,0 +1,297 @@
+import csv
+import gzip
+import hashlib
+import io
+import os
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+try:
+    import zstandard as zstd
+except ImportError:  # zstandard が無い環境では gzip にフォールバック
+    zstd = None
+
+# ---------------------------------------------------------
+# 設定
+# ---------------------------------------------------------
+MINUTES_DIR = Path("logs") / "minutes"
+# 議事録本体（内容のハッシュで決まるパスに圧縮して保存）
+OBJECTS_DIR = MINUTES_DIR / "objects"
+# 保存履歴のインデックス（使用ログの行と議事録本体を紐づける）
+INDEX_FILE = MINUTES_DIR / "index.csv"
+# 保持期間・容量上限により削除した議事録の記録
+DELETED_FILE = MINUTES_DIR / "deleted.csv"
+
+# 保持期間（日）。これより古い保存履歴は削除される。None で無期限
+RETENTION_DAYS = 365
+# 議事録本体の合計サイズ上限（MB、圧縮後）。超えた場合は古いものから削除。None で無制限
+MAX_STORE_MB = 500
+
+INDEX_HEADERS = [
+    "保存日時", "元ファイル名", "SHA256", "圧縮形式",
+    "元サイズ(バイト)", "圧縮後サイズ(バイト)", "議事録ファイル", "ログ上のパス"
+]
+DELETED_HEADERS = ["削除日時", "理由", "SHA256", "ログ上のパス"]
+
+CODEC_EXTENSIONS = {"zstd": ".md.zst", "gzip": ".md.gz"}
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Streamlit は1プロセス内の複数スレッドでセッションを処理するため、
+# インデックスの読み書きと本体の削除はこのロックで直列化する
+_lock = threading.RLock()
+
+
+def init_store():
+    """保存先ディレクトリとインデックスファイルを初期化"""
+    with _lock:
+        OBJECTS_DIR.mkdir(parents=True, exist_ok=True)
+        for path, headers in ((INDEX_FILE, INDEX_HEADERS), (DELETED_FILE, DELETED_HEADERS)):
+            if not path.exists():
+                with open(path, "w", newline="", encoding="utf-8") as f:
+                    csv.writer(f).writerow(headers)
+
+
+def _blob_path(digest, codec):
+    """ハッシュ値から2階層に分けた保存先パスを返す（例: objects/ab/cd/abcd....md.zst）"""
+    return OBJECTS_DIR / digest[:2] / digest[2:4] / f"{digest}{CODEC_EXTENSIONS[codec]}"
+
+
+def _find_blob(digest):
+    """既に保存済みの同一内容があればそのパスと圧縮形式を返す"""
+    for codec in CODEC_EXTENSIONS:
+        path = _blob_path(digest, codec)
+        if path.exists():
+            return path, codec
+    return None, None
+
+
+def _compress(data):
+    """利用可能な形式で圧縮し、(圧縮形式, 圧縮後データ) を返す"""
+    if zstd is not None:
+        return "zstd", zstd.ZstdCompressor(level=10).compress(data)
+    return "gzip", gzip.compress(data, compresslevel=9)
+
+
+def _write_atomic(path, data):
+    """一時ファイルに書き込んでから置き換える（書き込み途中のファイルを残さない）"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _write_csv_atomic(path, headers, rows):
+    buffer = io.StringIO(newline="")
+    writer = csv.writer(buffer)
+    writer.writerow(headers)
+    writer.writerows(rows)
+    _write_atomic(path, buffer.getvalue().encode("utf-8"))
+
+
+def _store(raw, original_filename, saved_at, logged_path=None):
+    """本体を保存（同一内容があれば再利用）してインデックスに追記し、本体のパスを返す"""
+    digest = hashlib.sha256(raw).hexdigest()
+
+    path, codec = _find_blob(digest)
+    if path is None:
+        codec, compressed = _compress(raw)
+        path = _blob_path(digest, codec)
+        _write_atomic(path, compressed)
+
+    with open(INDEX_FILE, "a", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerow([
+            saved_at,
+            original_filename,
+            digest,
+            codec,
+            len(raw),
+            path.stat().st_size,
+            str(path),
+            logged_path or str(path)
+        ])
+    return str(path)
+
+
+def store_minutes(minutes_text, original_filename):
+    """
+    議事録を内容のハッシュで圧縮保存し、使用ログに記録するパスを返す。
+    同じ内容が保存済みの場合は本体を書き込まず、インデックスにのみ追記する。
+    """
+    with _lock:
+        init_store()
+        return _store(minutes_text.encode("utf-8"), original_filename, datetime.now().strftime(TIME_FORMAT))
+
+
+def migrate_legacy_minutes():
+    """
+    従来の logs/minutes/*.md を圧縮保存に移行し、元のファイルを削除する。
+    使用ログに残っている旧パスはインデックスの「ログ上のパス」から引き当てられる。
+    保存日時には元ファイルの更新日時を使うため、移行後も保持期間の対象になる。
+    移行済みのパスはインデックスに追記し直さないため、何度実行してもよい。
+    移行できなかったファイルは (パス, エラーメッセージ) のリストで返す。
+    """
+    failures = []
+    with _lock:
+        init_store()
+        rows, invalid_rows = _read_index()
+        migrated = {row[7] for row in rows + invalid_rows if len(row) == len(INDEX_HEADERS)}
+        for legacy_path in sorted(MINUTES_DIR.glob("*.md")):
+            try:
+                if str(legacy_path) not in migrated:
+                    saved_at = datetime.fromtimestamp(legacy_path.stat().st_mtime).strftime(TIME_FORMAT)
+                    _store(legacy_path.read_bytes(), legacy_path.name, saved_at, logged_path=str(legacy_path))
+                    migrated.add(str(legacy_path))
+                legacy_path.unlink()
+            except Exception as e:
+                # 他のプロセスで開かれている場合など。次回起動時に再試行する
+                failures.append((str(legacy_path), str(e)))
+    return failures
+
+
+def _decompress(path):
+    data = path.read_bytes()
+    if path.name.endswith(CODEC_EXTENSIONS["zstd"]):
+        if zstd is None:
+            raise RuntimeError("zstd形式の議事録を読み込むには zstandard パッケージが必要です")
+        return zstd.ZstdDecompressor().decompressobj().decompress(data)
+    return gzip.decompress(data)
+
+
+def load_minutes(minutes_file):
+    """
+    使用ログの「議事録ファイル」列の値から議事録本文を読み込む。
+    移行済みの従来形式（logs/minutes/*.md）のパスはインデックスから本体を引き当てる。
+    見つからない場合は None を返す。
+    """
+    if not minutes_file:
+        return None
+    with _lock:
+        path = Path(minutes_file)
+        if not path.name.endswith(tuple(CODEC_EXTENSIONS.values())):
+            rows, _ = _read_index()
+            path = next((Path(row[6]) for row in rows if row[7] == minutes_file), None)
+        if path is None or not path.exists():
+            return None
+        return _decompress(path).decode("utf-8")
+
+
+def find_deletion(minutes_file):
+    """保持期間・容量上限により削除された議事録であれば (削除日時, 理由) を返す"""
+    if not minutes_file or not DELETED_FILE.exists():
+        return None
+    with _lock, open(DELETED_FILE, "r", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row in reader:
+            if len(row) == len(DELETED_HEADERS) and row[3] == minutes_file:
+                return row[0], row[1]
+    return None
+
+
+def _is_valid_row(row):
+    if len(row) != len(INDEX_HEADERS):
+        return False
+    try:
+        datetime.strptime(row[0], TIME_FORMAT)
+        int(row[4])
+        int(row[5])
+    except ValueError:
+        return False
+    return True
+
+
+def _read_index():
+    """インデックスを (正常な行, 不正な行) に分けて返す。不正な行は削除対象にしない"""
+    if not INDEX_FILE.exists():
+        return [], []
+    with open(INDEX_FILE, "r", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        rows = list(reader)
+    return [row for row in rows if _is_valid_row(row)], [row for row in rows if not _is_valid_row(row)]
+
+
+def enforce_retention(retention_days=RETENTION_DAYS, max_store_mb=MAX_STORE_MB, protect=None):
+    """
+    保持期間・合計サイズの上限を超えた保存履歴を削除し、
+    どの履歴からも参照されなくなった議事録本体を削除する。削除した本体の数を返す。
+    protect に指定した本体（直前に保存したものなど）は削除しない。
+    削除により使用ログのパスが読めなくなった場合は deleted.csv に記録する。
+    """
+    with _lock:
+        rows, invalid_rows = _read_index()
+        if not rows:
+            return 0
+        # 行番号 -> 削除理由
+        dropped = {}
+
+        if retention_days is not None:
+            cutoff = (datetime.now() - timedelta(days=retention_days)).strftime(TIME_FORMAT)
+            for i, row in enumerate(rows):
+                if row[0] < cutoff and row[6] != protect:
+                    dropped[i] = "保持期間超過"
+
+        if max_store_mb is not None:
+            # 同じ本体は一度だけ数え、古い履歴から順に上限に収まるまで削除する
+            max_bytes = max_store_mb * 1024 * 1024
+            latest = {}
+            for i, row in enumerate(rows):
+                if i not in dropped:
+                    latest[row[6]] = max(latest.get(row[6], ("", 0)), (row[0], int(row[5])))
+            total = sum(size for _, size in latest.values())
+            over_cap = set()
+            for blob, (_, size) in sorted(latest.items(), key=lambda item: item[1][0]):
+                if total <= max_bytes:
+                    break
+                if blob == protect:
+                    continue
+                over_cap.add(blob)
+                total -= size
+            for i, row in enumerate(rows):
+                if row[6] in over_cap:
+                    dropped[i] = "容量上限超過"
+
+        if not dropped:
+            return 0
+
+        kept = [row for i, row in enumerate(rows) if i not in dropped]
+        _write_csv_atomic(INDEX_FILE, INDEX_HEADERS, kept + invalid_rows)
+
+        # 参照されなくなった本体を削除
+        referenced = {row[6] for row in kept} | {row[6] for row in invalid_rows if len(row) > 6}
+        removed = 0
+        for blob in {rows[i][6] for i in dropped} - referenced:
+            path = Path(blob)
+            if path.exists():
+                path.unlink()
+                removed += 1
+            # 空になったシャードディレクトリも片付ける
+            for parent in (path.parent, path.parent.parent):
+                if parent != OBJECTS_DIR and parent.exists() and not any(parent.iterdir()):
+                    parent.rmdir()
+
+        # 使用ログのパスが読めなくなったものを記録
+        resolvable = {row[7] for row in kept} | referenced
+        deleted_at = datetime.now().strftime(TIME_FORMAT)
+        tombstones = {}
+        for i, reason in dropped.items():
+            logged_path = rows[i][7]
+            if logged_path not in resolvable:
+                tombstones[logged_path] = [deleted_at, reason, rows[i][2], logged_path]
+        if tombstones:
+            is_new = not DELETED_FILE.exists()
+            with open(DELETED_FILE, "a", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                if is_new:
+                    writer.writerow(DELETED_HEADERS)
+                writer.writerows(tombstones.values())
+        return removed
@@ -0,0 +1,16 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import minutes_store
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """一時ディレクトリ上で minutes_store を使う"""
+    monkeypatch.chdir(tmp_path)
+    minutes_store.init_store()
+    return minutes_store
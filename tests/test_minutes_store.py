@@ -0,0 +1,202 @@
+import csv
+import gzip
+import os
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+
+def read_index(store):
+    with open(store.INDEX_FILE, "r", encoding="utf-8") as f:
+        return list(csv.reader(f))[1:]
+
+
+def set_saved_at(store, saved_at):
+    """インデックスの保存日時をすべて書き換える"""
+    rows = read_index(store)
+    for row in rows:
+        row[0] = saved_at
+    store._write_csv_atomic(store.INDEX_FILE, store.INDEX_HEADERS, rows)
+
+
+def test_identical_minutes_are_stored_once(store):
+    first = store.store_minutes("# 議事録\n決定事項", "a.mp3")
+    second = store.store_minutes("# 議事録\n決定事項", "b.mp3")
+
+    assert first == second
+    assert len(list(store.OBJECTS_DIR.rglob("*.md.*"))) == 1
+    assert [row[1] for row in read_index(store)] == ["a.mp3", "b.mp3"]
+
+
+def test_blobs_are_sharded_by_hash(store):
+    path = Path(store.store_minutes("本文", "a.mp3"))
+    digest = read_index(store)[0][2]
+
+    assert path.parent == store.OBJECTS_DIR / digest[:2] / digest[2:4]
+    assert path.name.startswith(digest)
+
+
+def test_gzip_round_trip(store, monkeypatch):
+    monkeypatch.setattr(store, "zstd", None)
+    path = store.store_minutes("gzip の議事録", "a.mp3")
+
+    assert path.endswith(".md.gz")
+    assert gzip.decompress(Path(path).read_bytes()).decode("utf-8") == "gzip の議事録"
+    assert store.load_minutes(path) == "gzip の議事録"
+
+
+def test_zstd_round_trip(store):
+    pytest.importorskip("zstandard")
+    path = store.store_minutes("zstd の議事録", "a.mp3")
+
+    assert path.endswith(".md.zst")
+    assert store.load_minutes(path) == "zstd の議事録"
+
+
+def test_legacy_minutes_are_migrated(store):
+    legacy = store.MINUTES_DIR / "20240101_120000_meeting.md"
+    legacy.write_text("従来の議事録", encoding="utf-8")
+    old = time.time() - 10 * 24 * 60 * 60
+    os.utime(legacy, (old, old))
+
+    assert store.migrate_legacy_minutes() == []
+
+    assert not legacy.exists()
+    assert store.load_minutes(str(legacy)) == "従来の議事録"
+    # 更新日時が保存日時になり、保持期間の対象になる
+    store.enforce_retention(retention_days=5, max_store_mb=None)
+    assert store.load_minutes(str(legacy)) is None
+    assert store.find_deletion(str(legacy))[1] == "保持期間超過"
+
+
+def test_legacy_migration_survives_unlink_failure(store, monkeypatch):
+    legacy = store.MINUTES_DIR / "20240101_120000_meeting.md"
+    legacy.write_text("開かれている議事録", encoding="utf-8")
+    unlink = Path.unlink
+
+    def locked_unlink(self, *args, **kwargs):
+        if self.suffix == ".md":
+            raise PermissionError("used by another process")
+        return unlink(self, *args, **kwargs)
+
+    monkeypatch.setattr(Path, "unlink", locked_unlink)
+
+    for _ in range(3):
+        failures = store.migrate_legacy_minutes()
+        assert failures == [(str(legacy), "used by another process")]
+
+    # 移行済みのパスは追記し直さない
+    assert [row[7] for row in read_index(store)] == [str(legacy)]
+    assert store.load_minutes(str(legacy)) == "開かれている議事録"
+    # 保存は引き続き行える
+    path = store.store_minutes("新しい議事録", "a.mp3")
+    assert store.load_minutes(path) == "新しい議事録"
+    assert len(read_index(store)) == 2
+
+    # ロックが外れれば次回の移行で元ファイルだけ削除される
+    monkeypatch.setattr(Path, "unlink", unlink)
+    assert store.migrate_legacy_minutes() == []
+    assert not legacy.exists()
+    assert len(read_index(store)) == 2
+
+
+def test_saving_does_not_migrate_legacy_minutes(store):
+    legacy = store.MINUTES_DIR / "20240101_120000_meeting.md"
+    legacy.write_text("従来の議事録", encoding="utf-8")
+
+    store.store_minutes("新しい議事録", "a.mp3")
+
+    assert legacy.exists()
+    assert [row[1] for row in read_index(store)] == ["a.mp3"]
+
+
+def test_retention_drops_old_entries(store):
+    old_path = store.store_minutes("古い議事録", "old.mp3")
+    set_saved_at(store, "2000-01-01 00:00:00")
+    new_path = store.store_minutes("新しい議事録", "new.mp3")
+
+    removed = store.enforce_retention(retention_days=30, max_store_mb=None)
+
+    assert removed == 1
+    assert not Path(old_path).exists()
+    assert Path(new_path).exists()
+    assert [row[1] for row in read_index(store)] == ["new.mp3"]
+    assert store.find_deletion(old_path)[1] == "保持期間超過"
+    assert store.find_deletion(new_path) is None
+
+
+def test_retention_keeps_blob_still_referenced(store):
+    path = store.store_minutes("同じ議事録", "old.mp3")
+    set_saved_at(store, "2000-01-01 00:00:00")
+    store.store_minutes("同じ議事録", "new.mp3")
+
+    assert store.enforce_retention(retention_days=30, max_store_mb=None) == 0
+    assert store.load_minutes(path) == "同じ議事録"
+    assert store.find_deletion(path) is None
+
+
+def test_size_cap_drops_oldest_blobs(store):
+    first = store.store_minutes("一つ目" * 1000, "1.mp3")
+    set_saved_at(store, "2024-01-01 00:00:00")
+    second = store.store_minutes("二つ目" * 1000, "2.mp3")
+    cap_mb = Path(second).stat().st_size / (1024 * 1024)
+
+    removed = store.enforce_retention(retention_days=None, max_store_mb=cap_mb)
+
+    assert removed == 1
+    assert not Path(first).exists()
+    assert Path(second).exists()
+    assert store.find_deletion(first)[1] == "容量上限超過"
+
+
+def test_size_cap_never_drops_protected_blob(store):
+    path = store.store_minutes("大きな議事録", "a.mp3")
+
+    assert store.enforce_retention(retention_days=None, max_store_mb=0, protect=path) == 0
+    assert store.load_minutes(path) == "大きな議事録"
+
+
+def test_unreferenced_blobs_and_empty_shards_are_removed(store):
+    path = Path(store.store_minutes("削除される議事録", "a.mp3"))
+    set_saved_at(store, "2000-01-01 00:00:00")
+
+    store.enforce_retention(retention_days=30, max_store_mb=None)
+
+    assert not path.exists()
+    assert not path.parent.exists()
+    assert not path.parent.parent.exists()
+    assert store.OBJECTS_DIR.exists()
+
+
+def test_malformed_index_rows_are_skipped(store):
+    old_path = store.store_minutes("古い議事録", "old.mp3")
+    set_saved_at(store, "2000-01-01 00:00:00")
+    path = store.store_minutes("議事録", "a.mp3")
+    with open(store.INDEX_FILE, "a", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerow(["2000-01-01 00:00:00", "x.mp3", "abc", "gzip", "不正", "不正", path, path])
+
+    assert store.enforce_retention(retention_days=30, max_store_mb=None) == 1
+    assert not Path(old_path).exists()
+    # 不正な行は削除せずに残す
+    assert [row[1] for row in read_index(store)] == ["a.mp3", "x.mp3"]
+    assert store.load_minutes(path) == "議事録"
+
+
+def test_concurrent_saves_keep_index_consistent(store):
+    def save(n):
+        for i in range(20):
+            store.store_minutes(f"議事録 {n}-{i % 5}", f"{n}.mp3")
+            store.enforce_retention(retention_days=None, max_store_mb=0.001)
+
+    threads = [threading.Thread(target=save, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    indexed = {row[6] for row in read_index(store)}
+    blobs = {str(path) for path in store.OBJECTS_DIR.rglob("*.md.*")}
+    assert indexed == blobs
+    assert not list(store.MINUTES_DIR.rglob("*.tmp"))